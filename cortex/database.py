@@ -246,7 +246,8 @@ class Database(object):
         Returns
         -------
         verts : Vertex class
-            If the surface information has "left" and "right" entries, a Vertex class is returned
+            If the surface information has "left" and "right" entries, or is stored as a
+            pair of <type>_left.npy and <type>_right.npy files, a Vertex class is returned
 
         - OR -
         
@@ -266,6 +267,14 @@ class Database(object):
             if not os.path.exists(os.path.join(self.filestore, subject, "surface-info")):
                 os.makedirs(os.path.join(self.filestore, subject, "surface-info"))
 
+        # imported subjects store one .npy file per hemisphere, which loads
+        # without extracting members from a zip archive
+        hemifiles = [os.path.splitext(surfifile)[0] + "_%s.npy"%hemi for hemi in ("left", "right")]
+        if not os.path.exists(surfifile) and not recache and all(map(os.path.exists, hemifiles)):
+            from .dataset import Vertex
+            verts = np.hstack([np.load(fname) for fname in hemifiles])
+            return Vertex(verts, subject)
+
         if not os.path.exists(surfifile) or recache:
             print ("Generating %s surface info..."%type)
             from . import surfinfo
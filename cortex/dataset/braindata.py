@@ -323,7 +323,7 @@ class VolumeData(BrainData):
                 mgrp = "/subjects/{subj}/transforms/{xfm}/masks/"
                 mgrp = mgrp.format(subj=self.subject, xfm=self.xfmname)
                 mname = "__%s" % _hash(self._mask)[:8]
-                _hdf_write(h5, self._mask, name=mname, group=mgrp)
+                _hdf_write(h5, self._mask, name=mname, group=mgrp, compression='lzf')
                 mask = mname
 
             node.attrs['mask'] = mask
@@ -630,12 +630,36 @@ def _hash(array):
     '''A simple numpy hash function'''
     return hashlib.sha1(array.tostring()).hexdigest()
 
-def _hdf_write(h5, data, name="data", group="/data"):
+def _read_direct(dset):
+    """Reads an entire HDF5 dataset into a freshly allocated array in a single
+    call, bypassing the high-level indexing machinery of h5py"""
+    out = np.empty(dset.shape, dset.dtype)
+    if out.size > 0:
+        dset.read_direct(out)
+    return out
+
+def _chunk_shape(shape, dtype, nbytes=1<<20):
+    """Returns a cube-like HDF5 chunk shape for an array of `shape` and `dtype`
+    holding at most about `nbytes`. h5py's automatic chunking favours the last
+    axis, which makes whole-volume and single-slice reads of (z, y, x) volumes
+    touch many small chunks; cube chunks keep both access patterns reasonably
+    local at the cost of reading some unneeded voxels for single slices."""
+    if len(shape) == 0 or 0 in shape:
+        return None
+    side = max(1, int((nbytes // np.dtype(dtype).itemsize) ** (1. / len(shape))))
+    return tuple(min(d, side) for d in shape)
+
+def _hdf_write(h5, data, name="data", group="/data", chunks=None, compression=None,
+               compression_opts=None):
+    if compression is not None and chunks is None:
+        chunks = _chunk_shape(data.shape, data.dtype)
+    kwargs = dict(chunks=chunks, compression=compression,
+                  compression_opts=compression_opts)
     try:
-        node = h5.require_dataset("%s/%s"%(group, name), data.shape, data.dtype, exact=True)
+        node = h5.require_dataset("%s/%s"%(group, name), data.shape, data.dtype, exact=True, **kwargs)
     except TypeError:
         del h5[group][name]
-        node = h5.create_dataset("%s/%s"%(group, name), data.shape, data.dtype, exact=True)
+        node = h5.create_dataset("%s/%s"%(group, name), data.shape, data.dtype, **kwargs)
 
     node[:] = data
     return node
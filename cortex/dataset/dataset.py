@@ -1,14 +1,26 @@
+import sys
 import tempfile
+import multiprocessing as mp
+from concurrent.futures import ProcessPoolExecutor
+
 import numpy as np
+import numexpr as ne
 import h5py
 
 from ..database import db
 from ..xfm import Transform
 
-from .braindata import _hdf_write
+from .braindata import _hdf_write, _read_direct
 from .views import normalize as _vnorm
 from .views import Dataview, Volume, _from_hdf_data
 
+# Chunk cache settings used when opening dataset files. The h5py default
+# (1 MiB, 521 slots) is too small to hold the chunks of a typical BrainData
+# volume, so repeated slice reads keep re-reading and decompressing them.
+_rdcc_nbytes = 256 * 1024 * 1024
+_rdcc_nslots = 100003
+_rdcc_w0 = 0.75
+
 class Dataset(object):
     """
     Wrapper for multiple data objects. This often does not need to be used 
@@ -20,6 +32,9 @@ class Dataset(object):
     def __init__(self, **kwargs):
         self.h5 = None
         self.views = {}
+        self._group_cache = {}
+        self._xfm_cache = {}
+        self._sorted_views = None
 
         self.append(**kwargs)
 
@@ -31,41 +46,61 @@ class Dataset(object):
             norm = normalize(data)
 
             if isinstance(norm, Dataview):
-                self.views[name] = norm
+                self._add_view(name, norm)
             elif isinstance(norm, Dataset):
-                self.views.update(norm.views)
+                for vname, view in norm.views.items():
+                    self._add_view(vname, view)
             else:
                 raise ValueError("Unknown input %s=%r"%(name, data))
 
         return self
 
+    def _add_view(self, name, view):
+        """Stores `view` under `name`. Views whose name is a valid identifier
+        that does not shadow an attribute of the dataset are also set on the
+        instance, so attribute access does not have to go through __getattr__.
+        """
+        if name in self.__dict__:
+            shadows = name not in self.views or self.__dict__[name] is not self.views[name]
+        else:
+            shadows = hasattr(type(self), name)
+        if name.isidentifier() and not shadows:
+            self.__dict__[name] = view
+        self.views[name] = view
+        self._sorted_views = None
+
     def __getattr__(self, attr):
-        if attr in self.__dict__:
-            return self.__dict__[attr]
-        elif attr in self.views:
+        if attr in self.views:
             return self.views[attr]
 
-        raise AttributeError
+        raise AttributeError(attr)
 
     def __getitem__(self, item):
         return self.views[item]
 
+    def _sorted(self):
+        """Returns the (name, view) pairs ordered by priority. The order is
+        cached until the next view is added."""
+        if self._sorted_views is None:
+            self._sorted_views = sorted(self.views.items(), key=lambda x: x[1].priority)
+        return self._sorted_views
+
     def __iter__(self):
-        for name, dv in sorted(self.views.items(), key=lambda x: x[1].priority):
+        for name, dv in self._sorted():
             yield name, dv
 
     def __repr__(self):
-        views = sorted(self.views.items(), key=lambda x: x[1].priority)
-        return "<Dataset with views [%s]>"%(', '.join([n for n, d in views]))
+        return "<Dataset with views [%s]>"%(', '.join([n for n, d in self._sorted()]))
 
     def __len__(self):
         return len(self.views)
 
     def __dir__(self):
-        return list(self.__dict__.keys()) + list(self.views.keys())
+        return list(set(self.__dict__.keys()) | set(self.views.keys()))
 
     @classmethod
-    def from_file(cls, filename, subject=None):
+    def from_file(cls, filename, subject=None, rdcc_nbytes=_rdcc_nbytes,
+                  rdcc_nslots=_rdcc_nslots, rdcc_w0=_rdcc_w0):
         """Load a pycortex Dataset (cortex.Dataset class) from a file
 
         Parameters
@@ -77,6 +112,14 @@ class Dataset(object):
             since the Dataset was created. `None` input assumes subject 
             name in saved file is a subject in your current pycortex
             filestore. By default None
+        rdcc_nbytes : int, optional
+            size in bytes of the HDF5 raw data chunk cache, by default 256 MiB
+        rdcc_nslots : int, optional
+            number of hash slots in the chunk cache; should be a prime number
+            roughly 100 times the number of chunks that fit in the cache.
+            By default 100003
+        rdcc_w0 : float, optional
+            chunk cache eviction policy, between 0 and 1. By default 0.75
 
         Returns
         -------
@@ -84,7 +127,11 @@ class Dataset(object):
             pycortex Dataset
         """        
         ds = cls()
-        ds.h5 = h5py.File(filename, 'r')
+        # SWMR read mode lets the file be loaded while another process has it
+        # open for single-writer/multiple-reader writing
+        ds.h5 = h5py.File(filename, 'r', swmr=True,
+                          rdcc_nbytes=rdcc_nbytes, rdcc_nslots=rdcc_nslots,
+                          rdcc_w0=rdcc_w0)
 
         db.auxfile = ds
 
@@ -93,14 +140,14 @@ class Dataset(object):
             if name in ("data", "subjects", "views"):
                 continue
             try:
-                ds.views[name] = _from_hdf_data(ds.h5, name, subject=subject)
+                ds._add_view(name, _from_hdf_data(ds.h5, name, subject=subject))
             except KeyError:
                 print('No metadata found for "%s", skipping...'%name)
 
         #load up the views generated by pycortex
         for name, node in ds.h5['views'].items():
             try:
-                ds.views[name] = Dataview.from_hdf(node, subject=subject)
+                ds._add_view(name, Dataview.from_hdf(node, subject=subject))
             except FileNotFoundError:
                 print("Could not load file; old subject name? Try using `subject` kwarg to specify a current pycortex subject")
                 raise
@@ -123,10 +170,14 @@ class Dataset(object):
 
     def save(self, filename=None, pack=False):
         if filename is not None:
-            self.h5 = h5py.File(filename, 'a')
+            self.h5 = h5py.File(filename, 'a', rdcc_nbytes=_rdcc_nbytes,
+                                rdcc_nslots=_rdcc_nslots, rdcc_w0=_rdcc_w0)
         elif self.h5 is None:
             raise ValueError("Must provide filename for new datasets")
 
+        self._group_cache.clear()
+        self._xfm_cache.clear()
+
         for name, view in self.views.items():
             view._write_hdf(self.h5, name=name)
             
@@ -155,8 +206,13 @@ class Dataset(object):
             left = self.get_surf(subject, type, "lh", nudge=nudge)
             right = self.get_surf(subject, type, "rh", nudge=nudge)
             if merge:
-                pts = np.vstack([left[0], right[0]])
-                polys = np.vstack([left[1], right[1]+len(left[0])])
+                nleft, ntri = len(left[0]), len(left[1])
+                pts = np.empty((nleft + len(right[0]), 3), left[0].dtype)
+                pts[:nleft] = left[0]
+                pts[nleft:] = right[0]
+                polys = np.empty((ntri + len(right[1]), 3), left[1].dtype)
+                polys[:ntri] = left[1]
+                np.add(right[1], nleft, out=polys[ntri:])
                 return pts, polys
 
             return left, right
@@ -164,10 +220,13 @@ class Dataset(object):
             if type == 'fiducial':
                 wpts, polys = self.get_surf(subject, 'wm', hemi)
                 ppts, _     = self.get_surf(subject, 'pia', hemi)
-                return (wpts + ppts) / 2, polys
+                # wpts is freshly read, so the midpoint is computed into it in
+                # a single pass without temporaries
+                ne.evaluate("(wpts + ppts) / 2", out=wpts, casting='same_kind')
+                return wpts, polys
 
-            group = self.h5['subjects'][subject]['surfaces'][type][hemi]
-            pts, polys = group['pts'][:].copy(), group['polys'][:].copy()
+            group = self._get_group('subjects', subject, 'surfaces', type, hemi)
+            pts, polys = _read_direct(group['pts']), _read_direct(group['polys'])
             if nudge:
                 if hemi == 'lh':
                     pts[:,0] -= pts[:,0].max()
@@ -178,25 +237,37 @@ class Dataset(object):
             raise IOError('Subject not found in package')
 
     def get_xfm(self, subject, xfmname):
+        if (subject, xfmname) in self._xfm_cache:
+            return self._xfm_cache[subject, xfmname]
         try:
-            group = self.h5['subjects'][subject]['transforms'][xfmname]
-            return Transform(group['xfm'][:], tuple(group['xfm'].attrs['shape']))
+            node = self._get_group('subjects', subject, 'transforms', xfmname, 'xfm')
+            xfm = Transform(_read_direct(node), tuple(node.attrs['shape']))
         except (KeyError, TypeError):
             raise IOError('Transform not found in package')
 
+        self._xfm_cache[subject, xfmname] = xfm
+        return xfm
+
     def get_mask(self, subject, xfmname, maskname):
         try:
-            group = self.h5['subjects'][subject]['transforms'][xfmname]['masks']
-            return group[maskname]
+            return self._get_group('subjects', subject, 'transforms', xfmname, 'masks', maskname)
         except (KeyError, TypeError):
             raise IOError('Mask not found in package')
 
     def get_overlay(self, subject, type='rois', **kwargs):
         try:
-            group = self.h5['subjects'][subject]
+            group = self._get_group('subjects', subject)
             if type == "rois":
+                node = group['rois']
+                if node.dtype == np.uint8:
+                    rois = _read_direct(node).tobytes()
+                else:
+                    #packed by older versions as a variable length string
+                    rois = node[0]
+                    if isinstance(rois, str):
+                        rois = rois.encode('utf-8')
                 tf = tempfile.NamedTemporaryFile()
-                tf.write(group['rois'][0])
+                tf.write(rois)
                 tf.seek(0)
                 return tf
         except (KeyError, TypeError):
@@ -204,15 +275,28 @@ class Dataset(object):
 
         raise TypeError('Unknown overlay type')
 
+    def _get_group(self, *path):
+        """Resolves the HDF5 node at `path` below the file root, caching every
+        intermediate node so that repeated lookups skip the traversal."""
+        if path in self._group_cache:
+            return self._group_cache[path]
+
+        if len(path) > 1:
+            node = self._get_group(*path[:-1])[path[-1]]
+        else:
+            node = self.h5[path[0]]
+        self._group_cache[path] = node
+        return node
+
     def prepend(self, prefix):
         """Adds the given `prefix` to the name of every data object and returns
         a new Dataset.
         """
-        ds = dict()
-        for name, data in self:
-            ds[prefix+name] = data
+        ds = Dataset()
+        for name, view in self.views.items():
+            ds._add_view(prefix+name, view)
 
-        return Dataset(**ds)
+        return ds
 
 def normalize(data):
     if isinstance(data, (Dataset, Dataview)):
@@ -226,20 +310,53 @@ def normalize(data):
 
     raise TypeError('Unknown input type')
 
+def _pool_map(func, items):
+    """Maps `func` over `items` in a process pool, so that each worker reads
+    from the filestore with its own file handles. Results are yielded in order
+    as they are consumed, for the caller to write serially into the single
+    output file.
+
+    Workers are forked so that user scripts without a __main__ guard are not
+    re-imported. Fork is only safe on Linux (macOS system frameworks crash in
+    forked children), so elsewhere the items are read in process."""
+    items = list(items)
+    if len(items) < 2 or not sys.platform.startswith('linux'):
+        for item in items:
+            yield func(item)
+        return
+
+    with ProcessPoolExecutor(mp_context=mp.get_context('fork'),
+                             initializer=_init_pool_worker) as pool:
+        for result in pool.map(func, items):
+            yield result
+
+def _init_pool_worker():
+    # a packed file loaded by Dataset.from_file stays attached to the
+    # database; HDF5 handles are not fork-safe, so workers only read from
+    # the filestore
+    db.auxfile = None
+
+def _pack_one_subj(subject):
+    rois = db.get_overlay(subject, modify_svg_file=False).toxml(pretty=False)
+
+    surfs = dict()
+    for surf in db.get_paths(subject)['surfs'].keys():
+        for hemi in ("lh", "rh"):
+            surfs[surf, hemi] = db.get_surf(subject, surf, hemi)
+
+    return subject, rois, surfs
+
 def _pack_subjs(h5, subjects):
-    for subject in subjects:
-        rois = db.get_overlay(subject, modify_svg_file=False)
-        rnode = h5.require_dataset("/subjects/%s/rois"%subject, (1,),
-                                   dtype=h5py.special_dtype(vlen=str))
-        rnode[0] = rois.toxml(pretty=False)
-
-        surfaces = db.get_paths(subject)['surfs']
-        for surf in surfaces.keys():
-            for hemi in ("lh", "rh"):
-                pts, polys = db.get_surf(subject, surf, hemi)
-                group = "/subjects/%s/surfaces/%s/%s"%(subject, surf, hemi)
-                _hdf_write(h5, pts, "pts", group)
-                _hdf_write(h5, polys, "polys", group)
+    for subject, rois, surfs in _pool_map(_pack_one_subj, subjects):
+        # store the overlay as a compressed byte blob; filters do not apply to
+        # the payload of variable length strings
+        _hdf_write(h5, np.frombuffer(rois, dtype=np.uint8), "rois",
+                   "/subjects/%s"%subject, compression='gzip', compression_opts=1)
+
+        for (surf, hemi), (pts, polys) in surfs.items():
+            group = "/subjects/%s/surfaces/%s/%s"%(subject, surf, hemi)
+            _hdf_write(h5, pts, "pts", group)
+            _hdf_write(h5, polys, "polys", group)
 
 def _pack_xfms(h5, xfms):
     for subj, xfmname in xfms:
@@ -252,4 +369,4 @@ def _pack_masks(h5, masks):
     for subj, xfm, maskname in masks:
         mask = db.get_mask(subj, xfm, maskname)
         group = "/subjects/%s/transforms/%s/masks"%(subj, xfm)
-        _hdf_write(h5, mask, maskname, group)
+        _hdf_write(h5, mask, maskname, group, compression='lzf')
@@ -6,7 +6,7 @@ import h5py
 import numpy as np
 
 from .. import options
-from .braindata import BrainData, VertexData, VolumeData
+from .braindata import BrainData, VertexData, VolumeData, _read_direct
 
 default_cmap = options.config.get("basic", "default_cmap")
 
@@ -50,8 +50,8 @@ def _from_hdf_data(h5, name, xfmname=None, subject=None, **kwargs):
     mask = None
     if 'mask' in attrs:
         if attrs['mask'].startswith("__"):
-            mask = h5['/subjects/%s/transforms/%s/masks/%s' %
-                      (attrs['subject'], xfmname, attrs['mask'])].value
+            mask = _read_direct(h5['/subjects/%s/transforms/%s/masks/%s' %
+                                   (attrs['subject'], xfmname, attrs['mask'])])
         else:
             mask = attrs['mask']
 
@@ -1,11 +1,52 @@
 from . import database
 import os.path as op
 import shutil
+import sys
+from concurrent.futures import ThreadPoolExecutor
 from .freesurfer import parse_curv
 import numpy as np
 import json
 import nibabel as nib
 
+# ioctl request that shares the source extents with the target file on
+# copy-on-write filesystems (btrfs, XFS)
+_FICLONE = 0x40049409
+
+def _copyfile(source, target):
+    """Copies `source` to `target`, as a reflink on Linux copy-on-write
+    filesystems (btrfs, XFS), where the copy is O(1) regardless of file size.
+    Otherwise falls back to shutil.copyfile, which already uses zero-copy
+    os.sendfile on Linux. Permission bits are copied as with shutil.copy."""
+    if (sys.platform.startswith('linux') and
+            not (op.exists(target) and op.samefile(source, target))):
+        import fcntl
+        try:
+            with open(source, 'rb') as fsrc, open(target, 'wb') as fdst:
+                fcntl.ioctl(fdst.fileno(), _FICLONE, fsrc.fileno())
+        except OSError:
+            shutil.copyfile(source, target)
+    else:
+        shutil.copyfile(source, target)
+    shutil.copymode(source, target)
+
+def _copy_all(copies, max_workers=8):
+    """Runs the independent (source, target) copies in `copies` in a thread
+    pool; the copies are IO-bound and release the GIL, so they overlap."""
+    with ThreadPoolExecutor(max_workers=max_workers) as ex:
+        list(ex.map(lambda st: _copyfile(*st), copies))
+
+def _load_all(func, filenames, max_workers=8):
+    """Loads every file in `filenames` with `func` in a thread pool"""
+    with ThreadPoolExecutor(max_workers=max_workers) as ex:
+        return list(ex.map(func, filenames))
+
+def _negated(data):
+    """Flips the sign of `data`, in place when the array allows it so that no
+    negated copy is allocated"""
+    if data.flags.writeable:
+        return np.negative(data, out=data)
+    return -data
+
 def import_subj(subject,
                 source_dir,
                 session=None,
@@ -44,7 +85,7 @@ def import_subj(subject,
 
     surfs = op.join(database.default_filestore, sname, "surfaces", "{name}_{hemi}.gii")
     anats = op.join(database.default_filestore, sname, "anatomicals", "{name}.nii.gz")
-    surfinfo = op.join(database.default_filestore, sname, "surface-info", "{name}.npz")
+    surfinfo = op.join(database.default_filestore, sname, "surface-info", "{name}_{hemi}.npy")
 
     fmriprep_dir = op.join(source_dir, 'fmriprep')
     if session is not None:
@@ -63,11 +104,10 @@ def import_subj(subject,
         t1w = op.join(fmriprep_dir, 'sub-{subject}{session_str}_desc-preproc_T1w.nii.gz')
         aseg = op.join(fmriprep_dir, 'sub-{subject}{session_str}_desc-aseg_dseg.nii.gz')
 
-    for fmp_fn, out_fn in zip([t1w.format(subject=subject, session_str=session_str),
-                               aseg.format(subject=subject, session_str=session_str)],
-                              [anats.format(name='raw'),
-                               anats.format(name='aseg')]):
-        shutil.copy(fmp_fn, out_fn)
+    copies = list(zip([t1w.format(subject=subject, session_str=session_str),
+                       aseg.format(subject=subject, session_str=session_str)],
+                      [anats.format(name='raw'),
+                       anats.format(name='aseg')]))
 
     
     #import surfaces
@@ -91,7 +131,9 @@ def import_subj(subject,
 
             target = str(surfs.format(subj=sname, name=name, hemi=hemi))
 
-            shutil.copy(source, target)
+            copies.append((source, target))
+
+    _copy_all(copies)
 
     #import surfinfo
     curvs = op.join(source_dir,
@@ -100,9 +142,13 @@ def import_subj(subject,
                          'surf',
                          '{hemi}.{info}')
 
-    for curv, info in dict(sulc="sulcaldepth", thickness="thickness", curv="curvature").items():
-        lh, rh = [parse_curv(curvs.format(hemi=hemi, info=curv, subject=subject)) for hemi in ['lh', 'rh']]
-        np.savez(surfinfo.format(subj=sname, name=info), left=-lh, right=-rh)
+    infos = dict(sulc="sulcaldepth", thickness="thickness", curv="curvature")
+    data = _load_all(lambda fname: _negated(parse_curv(fname)),
+                     [curvs.format(hemi=hemi, info=curv, subject=subject)
+                      for curv in infos for hemi in ['lh', 'rh']])
+    for info, lh, rh in zip(infos.values(), data[::2], data[1::2]):
+        np.save(surfinfo.format(name=info, hemi='left'), lh)
+        np.save(surfinfo.format(name=info, hemi='right'), rh)
 
     database.db = database.Database()
 
@@ -157,7 +203,7 @@ def import_subj_no_fs(subject,
 
     surfs = op.join(database.default_filestore, sname, "surfaces", "{name}_{hemi}.gii")
     anats = op.join(database.default_filestore, sname, "anatomicals", "{name}.nii.gz")
-    surfinfo = op.join(database.default_filestore, sname, "surface-info", "{name}.npz")
+    surfinfo = op.join(database.default_filestore, sname, "surface-info", "{name}_{hemi}.npy")
 
     fmriprep_dir = source_dir
     if session is not None:
@@ -172,11 +218,10 @@ def import_subj_no_fs(subject,
     t1w = op.join(fmriprep_dir, 'sub-{subject}{session_str}_desc-preproc_T1w.nii.gz')
     aseg = op.join(fmriprep_dir, 'sub-{subject}{session_str}_desc-aseg_dseg.nii.gz')
 
-    for fmp_fn, out_fn in zip([t1w.format(subject=subject, session_str=session_str),
-                               aseg.format(subject=subject, session_str=session_str)],
-                              [anats.format(name='raw'),
-                               anats.format(name='aseg')]):
-        shutil.copy(fmp_fn, out_fn)
+    copies = list(zip([t1w.format(subject=subject, session_str=session_str),
+                       aseg.format(subject=subject, session_str=session_str)],
+                      [anats.format(name='raw'),
+                       anats.format(name='aseg')]))
 
     
     #import surfaces
@@ -194,15 +239,19 @@ def import_subj_no_fs(subject,
 
             target = str(surfs.format(subj=sname, name=name, hemi=hemi))
 
-            shutil.copy(source, target)
+            copies.append((source, target))
+
+    _copy_all(copies)
 
     #import surfinfo
     curvs = op.join(fmriprep_dir, 'sub-{subject}_hemi-{hemi}_{info}.shape.gii')
 
-    for curv, info in dict(sulc="sulcaldepth", thickness="thickness", curv="curvature").items():
-        lh, rh = [
-                nib.load(curvs.format(hemi=hemi, info=curv, subject=subject)).darrays[0].data
-                for hemi in ['L', 'R']]
-        np.savez(surfinfo.format(subj=sname, name=info), left=-lh, right=-rh)
+    infos = dict(sulc="sulcaldepth", thickness="thickness", curv="curvature")
+    data = _load_all(lambda fname: _negated(nib.load(fname).darrays[0].data),
+                     [curvs.format(hemi=hemi, info=curv, subject=subject)
+                      for curv in infos for hemi in ['L', 'R']])
+    for info, lh, rh in zip(infos.values(), data[::2], data[1::2]):
+        np.save(surfinfo.format(name=info, hemi='left'), lh)
+        np.save(surfinfo.format(name=info, hemi='right'), rh)
 
     database.db = database.Database()
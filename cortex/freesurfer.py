@@ -206,7 +206,7 @@ def import_subj(
     filestore = os.path.join(database.default_filestore, pycortex_subject)
     anat_template = os.path.join(filestore, "anatomicals", "{name}.nii.gz")
     surf_template = os.path.join(filestore, "surfaces", "{name}_{hemi}.gii")
-    surfinfo_template = os.path.join(filestore, "surface-info", "{name}.npz")
+    surfinfo_template = os.path.join(filestore, "surface-info", "{name}_{hemi}.npy")
 
     # Dictionary mapping for volumes to be imported over from freesurfer
     volumes_fs2pycortex = {"T1": "raw", "aseg": "aseg", "wm": "raw_wm"}
@@ -255,11 +255,8 @@ def import_subj(
             fs_surf_template.format(hemi=hemi, name=fsname) for hemi in ["lh", "rh"]
         ]
         lh, rh = [parse_curv(in_info) for in_info in in_info_lhrh]
-        np.savez(
-            surfinfo_template.format(name=name), 
-            left=-lh, 
-            right=-rh
-        )
+        np.save(surfinfo_template.format(name=name, hemi="left"), -lh)
+        np.save(surfinfo_template.format(name=name, hemi="right"), -rh)
     # Finally update the database by re-initializing it
     database.db = database.Database()
 
@@ -0,0 +1,32 @@
+import os
+
+import numpy as np
+
+from cortex import db
+
+subj = "S1"
+
+
+def test_get_surfinfo_hemifiles():
+    nleft = len(db.get_surf(subj, "fiducial", "lh")[0])
+    nright = len(db.get_surf(subj, "fiducial", "rh")[0])
+    left, right = np.random.randn(nleft), np.random.randn(nright)
+
+    surfinfo_dir = os.path.join(db.filestore, subj, "surface-info")
+    os.makedirs(surfinfo_dir, exist_ok=True)
+    base = os.path.join(surfinfo_dir, "testinfo")
+    files = [base + "_left.npy", base + "_right.npy", base + ".npz"]
+    try:
+        np.save(files[0], left)
+        np.save(files[1], right)
+        verts = db.get_surfinfo(subj, "testinfo")
+        np.testing.assert_array_equal(verts.data, np.hstack([left, right]))
+
+        # an existing .npz takes precedence over the per-hemisphere files
+        np.savez(files[2], left=-left, right=-right)
+        verts = db.get_surfinfo(subj, "testinfo")
+        np.testing.assert_array_equal(verts.data, -np.hstack([left, right]))
+    finally:
+        for fname in files:
+            if os.path.exists(fname):
+                os.remove(fname)
@@ -1,5 +1,7 @@
 import cortex
 import numpy as np
+import h5py
+import sys
 import tempfile
 import pytest
 
@@ -35,6 +37,24 @@ def test_dataset():
     assert len(ds['thickstack'].data) == mask.sum()
     assert np.allclose(ds['stack'].data[mask], ds['thickstack'].data)
 
+def test_dataset_attributes():
+    vol = np.random.randn(*volshape)
+    ds = dataset.Dataset(randvol=(vol, subj, xfmname), save=(vol, subj, xfmname),
+                         h5=(vol, subj, xfmname))
+    assert ds.randvol is ds['randvol']
+    ds.append(randvol=(vol + 1, subj, xfmname))
+    assert ds.randvol is ds['randvol']
+    # views cannot shadow the attributes of the dataset
+    assert callable(ds.save)
+    assert ds.h5 is None
+    assert isinstance(ds['save'], dataset.Volume)
+    with pytest.raises(AttributeError):
+        ds.missing
+
+    pds = ds.prepend("sub_")
+    assert sorted(pds.views) == ["sub_h5", "sub_randvol", "sub_save"]
+    assert pds.sub_randvol is ds.randvol
+
 def test_findmask():
     vol = np.random.rand(10, *volshape)
     mask = db.get_mask(subj, xfmname, "thin")
@@ -119,6 +139,19 @@ def test_overwrite():
     ds.save()
     assert ds.test.data.shape == volshape
 
+def test_hdf_write_chunks():
+    from cortex.dataset.braindata import _hdf_write
+    tf = tempfile.NamedTemporaryFile(suffix=".hdf")
+    mask = db.get_mask(subj, xfmname, "thick")
+    with h5py.File(tf.name, "a") as h5:
+        node = _hdf_write(h5, mask, "thick", "/masks", compression='lzf')
+        assert node.compression == 'lzf'
+        assert node.chunks is not None
+        assert np.array_equal(node[:], mask)
+
+        node = _hdf_write(h5, np.zeros(10), "thick", "/masks")
+        assert node.shape == (10,)
+
 def test_pack():
     tf = tempfile.NamedTemporaryFile(suffix=".hdf")
     ds = cortex.Dataset(test=(np.random.randn(*volshape), subj, xfmname))
@@ -140,6 +173,30 @@ def test_pack():
 
     xfm = cortex.db.get_xfm(subj, xfmname)
     assert np.allclose(xfm.xfm, ds.get_xfm(subj, xfmname).xfm)
+    assert ds.get_xfm(subj, xfmname) is ds.get_xfm(subj, xfmname)
+
+def test_pack_subjs_pool():
+    from cortex.dataset.dataset import _pack_subjs
+    tf = tempfile.NamedTemporaryFile(suffix=".hdf")
+    with h5py.File(tf.name, "a") as h5:
+        # more than one item goes through the process pool
+        _pack_subjs(h5, [subj, subj])
+        pts, polys = db.get_surf(subj, "inflated", "rh")
+        group = h5["subjects/%s/surfaces/inflated/rh"%subj]
+        assert np.allclose(group["pts"][:], pts)
+        assert np.array_equal(group["polys"][:], polys)
+        assert h5["subjects/%s/rois"%subj].size > 0
+
+def _auxfile_is_none(_):
+    return db.auxfile is None
+
+def test_pool_map_ignores_auxfile():
+    from cortex.dataset.dataset import _pool_map
+    auxfile, db.auxfile = db.auxfile, object()
+    try:
+        assert all(_pool_map(_auxfile_is_none, range(2))) == sys.platform.startswith('linux')
+    finally:
+        db.auxfile = auxfile
 
 def test_map():
     dv = cortex.Volume.random(subj, xfmname)
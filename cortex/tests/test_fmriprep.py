@@ -0,0 +1,112 @@
+import json
+import os
+import shutil
+import stat
+
+import nibabel as nib
+import numpy as np
+import pytest
+
+from cortex import database, fmriprep
+from cortex.fmriprep import _copyfile, _negated
+
+
+def test_copyfile(tmp_path):
+    source = str(tmp_path / "source.bin")
+    target = str(tmp_path / "target.bin")
+    data = np.random.bytes(1 << 20)
+    with open(source, "wb") as fp:
+        fp.write(data)
+    os.chmod(source, stat.S_IRUSR | stat.S_IWUSR | stat.S_IRGRP)
+
+    _copyfile(source, target)
+    with open(target, "rb") as fp:
+        assert fp.read() == data
+    assert stat.S_IMODE(os.stat(target).st_mode) == stat.S_IMODE(os.stat(source).st_mode)
+
+    # copying over an existing file replaces its content
+    with open(target, "wb") as fp:
+        fp.write(b"x" * (2 << 20))
+    _copyfile(source, target)
+    with open(target, "rb") as fp:
+        assert fp.read() == data
+
+
+def test_copyfile_samefile(tmp_path):
+    source = str(tmp_path / "source.bin")
+    with open(source, "wb") as fp:
+        fp.write(b"data")
+
+    with pytest.raises(shutil.SameFileError):
+        _copyfile(source, source)
+    with open(source, "rb") as fp:
+        assert fp.read() == b"data"
+
+
+def test_negated():
+    data = np.arange(5, dtype=np.float32)
+    result = _negated(data)
+    # writeable arrays are negated in place
+    assert result is data
+    np.testing.assert_array_equal(result, -np.arange(5))
+
+    data = np.arange(5, dtype=np.float32)
+    data.flags.writeable = False
+    result = _negated(data)
+    assert result is not data
+    np.testing.assert_array_equal(result, -np.arange(5))
+    np.testing.assert_array_equal(data, np.arange(5))
+
+
+def _make_fmriprep_dir(source_dir, nverts=10):
+    anat = os.path.join(source_dir, "sub-01", "anat")
+    os.makedirs(anat)
+    with open(os.path.join(source_dir, "dataset_description.json"), "w") as fp:
+        json.dump({"GeneratedBy": [{"Version": "23.2.0"}]}, fp)
+
+    img = nib.Nifti1Image(np.zeros((4, 4, 4), np.float32), np.eye(4))
+    for name in ["desc-preproc_T1w", "desc-aseg_dseg"]:
+        nib.save(img, os.path.join(anat, "sub-01_%s.nii.gz" % name))
+
+    pts = np.random.rand(nverts, 3).astype(np.float32)
+    polys = np.array([[0, 1, 2]], dtype=np.int32)
+    for name in ["white", "pial", "midthickness", "inflated"]:
+        for hemi in "LR":
+            surf = nib.gifti.GiftiImage(darrays=[
+                nib.gifti.GiftiDataArray(pts, "NIFTI_INTENT_POINTSET"),
+                nib.gifti.GiftiDataArray(polys, "NIFTI_INTENT_TRIANGLE")])
+            nib.save(surf, os.path.join(anat, "sub-01_hemi-%s_%s.surf.gii" % (hemi, name)))
+
+    for info in ["sulc", "thickness", "curv"]:
+        for offset, hemi in enumerate("LR"):
+            data = np.arange(nverts, dtype=np.float32) + offset
+            shape = nib.gifti.GiftiImage(darrays=[nib.gifti.GiftiDataArray(data)])
+            nib.save(shape, os.path.join(anat, "sub-01_hemi-%s_%s.shape.gii" % (hemi, info)))
+
+
+def test_import_subj_no_fs(tmp_path, monkeypatch):
+    filestore, source_dir = str(tmp_path / "filestore"), str(tmp_path / "fmriprep")
+    os.makedirs(filestore)
+    os.makedirs(source_dir)
+    _make_fmriprep_dir(source_dir)
+    monkeypatch.setattr(database, "default_filestore", filestore)
+    monkeypatch.setattr(database, "db", database.Database(filestore))
+
+    fmriprep.import_subj_no_fs("01", source_dir)
+
+    subjdir = os.path.join(filestore, "01")
+    assert sorted(os.listdir(os.path.join(subjdir, "anatomicals"))) == \
+        ["aseg.nii.gz", "raw.nii.gz"]
+    surfaces = os.listdir(os.path.join(subjdir, "surfaces"))
+    assert sorted(surfaces) == sorted("%s_%s.gii" % (name, hemi)
+                                      for name in ["wm", "pia", "fiducial", "inflated"]
+                                      for hemi in ["lh", "rh"])
+    anat = os.path.join(source_dir, "sub-01", "anat")
+    with open(os.path.join(anat, "sub-01_hemi-R_pial.surf.gii"), "rb") as fp:
+        source = fp.read()
+    with open(os.path.join(subjdir, "surfaces", "pia_rh.gii"), "rb") as fp:
+        assert fp.read() == source
+
+    # curvature info is stored with flipped sign
+    curv = np.load(os.path.join(subjdir, "surface-info", "curvature_right.npy"))
+    np.testing.assert_array_equal(curv, -(np.arange(10) + 1))